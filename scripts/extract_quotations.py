@@ -7,6 +7,8 @@ Finds mentions of notable figures and identifies potential quotes ATTRIBUTED to
 import sqlite3
 import json
 import re
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from pathlib import Path
 
 DB_PATH = Path(__file__).parent.parent / "data" / "un_speeches.db"
@@ -15,37 +17,182 @@ DB_PATH = Path(__file__).parent.parent / "data" / "un_speeches.db"
 QUOTE_CHARS = r'["\'\u201c\u201d\u2018\u2019\u00ab\u00bb]'  # " ' " " ' ' « »
 QUOTE_OPEN = r'[\"\'\u201c\u2018\u00ab]'   # Opening quotes: " ' " ' «
 QUOTE_CLOSE = r'[\"\'\u201d\u2019\u00bb]'  # Closing quotes: " ' " ' »
+# Quote content: 10-500 chars containing no quote marks
+Q_CONTENT = r'[^"\'\u201c\u201d\u2018\u2019\u00ab\u00bb]{10,500}'
+# Same characters as a set, for a cheap "any quote at all?" check
+QUOTE_SET = frozenset('"\'\u201c\u201d\u2018\u2019\u00ab\u00bb')
+
+INSERT_QUOTATION_SQL = """
+    INSERT INTO quotations
+    (figure_id, speech_id, chunk_id, quote_text, context_text,
+     year, country_name, is_direct_quote, confidence_score)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# chunks_fts and its sync triggers, as defined in create-chunks-table.sql
+CHUNKS_FTS_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+      text,
+      summary,
+      themes,
+      notable,
+      content=chunks,
+      content_rowid=id
+    );
+
+    CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+      INSERT INTO chunks_fts(rowid, text, summary, themes, notable)
+      VALUES (new.id, new.text, new.summary, new.themes, new.notable);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+      INSERT INTO chunks_fts(chunks_fts, rowid, text, summary, themes, notable)
+      VALUES('delete', old.id, old.text, old.summary, old.themes, old.notable);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS chunks_au AFTER UPDATE ON chunks BEGIN
+      INSERT INTO chunks_fts(chunks_fts, rowid, text, summary, themes, notable)
+      VALUES('delete', old.id, old.text, old.summary, old.themes, old.notable);
+      INSERT INTO chunks_fts(rowid, text, summary, themes, notable)
+      VALUES (new.id, new.text, new.summary, new.themes, new.notable);
+    END;
+"""
 
 def get_connection():
     return sqlite3.connect(DB_PATH)
 
+def has_chunks_fts(conn):
+    """Check whether the chunks_fts index (see create-chunks-table.sql) exists."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunks_fts'"
+    ).fetchone()
+    return row is not None
+
+def ensure_chunks_fts(conn):
+    """Create and populate chunks_fts if it's missing, and fail if it's out of
+    sync with chunks (every figure lookup would silently find nothing)."""
+    if not has_chunks_fts(conn):
+        print("Building chunks_fts index...")
+        conn.executescript(CHUNKS_FTS_SQL)
+        conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES('rebuild')")
+        conn.commit()
+
+    # count(*) on an external-content table reads chunks itself, so count
+    # the indexed documents via the docsize shadow table instead
+    indexed = conn.execute("SELECT COUNT(*) FROM chunks_fts_docsize").fetchone()[0]
+    total = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    if indexed != total:
+        raise RuntimeError(
+            f"chunks_fts is out of sync ({indexed} indexed, {total} chunks); "
+            "run: INSERT INTO chunks_fts(chunks_fts) VALUES('rebuild')"
+        )
+
+def fts_phrase(pattern):
+    """Build an FTS5 prefix-phrase query restricted to the text column, or None
+    if the pattern can't be expressed as a phrase (falls back to LIKE).
+
+    The trailing * keeps forms that extend the last token ("Gandhian",
+    "Marxist"), which LIKE '%pattern%' also matched.
+    """
+    if '"' in pattern or not any(ch.isalnum() for ch in pattern):
+        return None
+    return f'text : "{pattern}"*'
+
 def extract_quotations_for_figure(conn, figure_id, name, search_patterns):
-    """Extract quotations mentioning a specific figure."""
+    """Yield quotations mentioning a specific figure, one at a time."""
     cursor = conn.cursor()
     patterns = json.loads(search_patterns)
-
-    quotations = []
+    use_fts = has_chunks_fts(conn)
 
     for pattern in patterns:
-        # Build LIKE clause
-        like_pattern = f"%{pattern}%"
-
-        # Find chunks mentioning this figure
-        cursor.execute("""
-            SELECT
-                c.id as chunk_id,
-                c.speech_id,
-                c.text,
-                s.year,
-                s.country_name,
-                s.speaker
-            FROM chunks c
-            JOIN speeches s ON c.speech_id = s.id
-            WHERE c.text LIKE ?
-            ORDER BY s.year DESC
-        """, (like_pattern,))
-
-        for row in cursor.fetchall():
+        pattern_lower = pattern.lower()
+
+        # Patterns that indicate a quote is attributed TO this figure
+        # The pattern must be near the figure's name
+        # Use Unicode-aware quote patterns
+        q_open = QUOTE_OPEN
+        q_close = QUOTE_CLOSE
+        q_content = Q_CONTENT
+        esc = re.escape(pattern_lower)
+
+        # Ordered so the most common forms are tried first; the loop below
+        # stops at the first match
+        attribution_patterns = [
+            # "X said/wrote", "X once said/wrote", "X famously said/wrote"
+            (rf'{esc}\s+(once\s+|famously\s+)?(said|wrote)[,:.;]?\s*{q_open}({q_content}){q_close}', 0.95, 3),
+            # "As X said/wrote/put it"
+            (rf'as\s+{esc}\s+(once\s+)?(said|wrote|put it)[,:.;]?\s*{q_open}({q_content}){q_close}', 0.95, 3),
+            # Quote followed by attribution: "..." - X
+            (rf'{q_open}({q_content}){q_close}\s*[-–—]\s*{esc}', 0.95, 1),
+            # "said X" or "wrote X" (attribution after verb) - rare but possible
+            (rf'said\s+{esc}[,:.;]?\s*{q_open}({q_content}){q_close}', 0.9, 1),
+            # "In the words of X"
+            (rf'in the words of\s+{esc}[,:.;]?\s*{q_open}({q_content}){q_close}', 0.95, 1),
+            # "To quote X"
+            (rf'to quote\s+{esc}[,:.;]?\s*{q_open}({q_content}){q_close}', 0.95, 1),
+            # "X reminded us" / "X taught us"
+            (rf'{esc}\s+(reminded|taught) us[,:.;]?\s*{q_open}({q_content}){q_close}', 0.9, 2),
+            # Quote followed by "said X" or "wrote X"
+            (rf'{q_open}({q_content}){q_close}\s*,?\s*(said|wrote)\s+{esc}', 0.9, 1),
+        ]
+
+        # Check if the name is mentioned with verbs suggesting teaching/belief
+        weak_indicators = [
+            (rf'{esc}\s+believed', 0.5),
+            (rf'{esc}\s+argued', 0.5),
+            (rf'{esc}\s+stated', 0.5),
+            (rf'according to\s+{esc}', 0.4),
+            (rf'philosophy of\s+{esc}', 0.4),
+            (rf'teachings of\s+{esc}', 0.5),
+            (rf'ideas of\s+{esc}', 0.4),
+            (rf'legacy of\s+{esc}', 0.4),
+            (rf"{esc}['']s\s+(words|teachings|philosophy|ideas)", 0.5),
+        ]
+
+        # Compile once per pattern rather than once per matching chunk
+        compiled_attrib = [
+            (re.compile(regex, re.IGNORECASE), score, quote_group)
+            for regex, score, quote_group in attribution_patterns
+        ]
+        compiled_weak = [
+            (re.compile(regex, re.IGNORECASE), score)
+            for regex, score in weak_indicators
+        ]
+
+        # Find chunks mentioning this figure. Prefer the FTS index; a leading
+        # wildcard LIKE can't use any index and scans every chunk.
+        phrase = fts_phrase(pattern) if use_fts else None
+        if phrase is not None:
+            cursor.execute("""
+                SELECT
+                    c.id as chunk_id,
+                    c.speech_id,
+                    c.text,
+                    s.year,
+                    s.country_name,
+                    s.speaker
+                FROM chunks_fts f
+                JOIN chunks c ON c.id = f.rowid
+                JOIN speeches s ON c.speech_id = s.id
+                WHERE chunks_fts MATCH ?
+            """, (phrase,))
+        else:
+            like_pattern = f"%{pattern}%"
+            cursor.execute("""
+                SELECT
+                    c.id as chunk_id,
+                    c.speech_id,
+                    c.text,
+                    s.year,
+                    s.country_name,
+                    s.speaker
+                FROM chunks c
+                JOIN speeches s ON c.speech_id = s.id
+                WHERE c.text LIKE ?
+            """, (like_pattern,))
+
+        # Iterate the cursor directly so only one chunk's text is held at a time
+        for row in cursor:
             chunk_id, speech_id, text, year, country, speaker = row
 
             # Determine if this looks like a direct quote FROM this figure
@@ -54,7 +201,6 @@ def extract_quotations_for_figure(conn, figure_id, name, search_patterns):
             extracted_quote = None
 
             text_lower = text.lower()
-            pattern_lower = pattern.lower()
 
             # Find position of the pattern
             pos = text_lower.find(pattern_lower)
@@ -65,47 +211,21 @@ def extract_quotations_for_figure(conn, figure_id, name, search_patterns):
             start = max(0, pos - 500)
             end = min(len(text), pos + len(pattern) + 500)
             context_text = text[start:end]
-            context_lower = context_text.lower()
-
-            # Find position of pattern in context
-            pattern_pos_in_context = context_lower.find(pattern_lower)
-
-            # Patterns that indicate a quote is attributed TO this figure
-            # The pattern must be near the figure's name
-            # Use Unicode-aware quote patterns
-            q_open = QUOTE_OPEN
-            q_close = QUOTE_CLOSE
-            q_any = QUOTE_CHARS
-            # Pattern for quote content (non-greedy, 10-500 chars)
-            q_content = rf'[^"\'\u201c\u201d\u2018\u2019\u00ab\u00bb]{{10,500}}'
-
-            attribution_patterns = [
-                # "X said" followed by quote
-                (rf'{re.escape(pattern_lower)}\s+(once\s+)?said[,:.;]?\s*{q_open}({q_content}){q_close}', 0.95, 2),
-                (rf'{re.escape(pattern_lower)}\s+(once\s+)?wrote[,:.;]?\s*{q_open}({q_content}){q_close}', 0.95, 2),
-                # "said X" or "wrote X" (attribution after verb) - rare but possible
-                (rf'said\s+{re.escape(pattern_lower)}[,:.;]?\s*{q_open}({q_content}){q_close}', 0.9, 1),
-                # "As X said/wrote/put it"
-                (rf'as\s+{re.escape(pattern_lower)}\s+(once\s+)?(said|wrote|put it)[,:.;]?\s*{q_open}({q_content}){q_close}', 0.95, 3),
-                # "In the words of X"
-                (rf'in the words of\s+{re.escape(pattern_lower)}[,:.;]?\s*{q_open}({q_content}){q_close}', 0.95, 1),
-                # "X famously said/wrote"
-                (rf'{re.escape(pattern_lower)}\s+famously\s+(said|wrote)[,:.;]?\s*{q_open}({q_content}){q_close}', 0.95, 2),
-                # "To quote X"
-                (rf'to quote\s+{re.escape(pattern_lower)}[,:.;]?\s*{q_open}({q_content}){q_close}', 0.95, 1),
-                # "X reminded us"
-                (rf'{re.escape(pattern_lower)}\s+reminded us[,:.;]?\s*{q_open}({q_content}){q_close}', 0.9, 1),
-                # "X taught us"
-                (rf'{re.escape(pattern_lower)}\s+taught us[,:.;]?\s*{q_open}({q_content}){q_close}', 0.9, 1),
-                # Quote followed by attribution: "..." - X
-                (rf'{q_open}({q_content}){q_close}\s*[-–—]\s*{re.escape(pattern_lower)}', 0.95, 1),
-                # Quote followed by "said X" or "wrote X"
-                (rf'{q_open}({q_content}){q_close}\s*,?\s*(said|wrote)\s+{re.escape(pattern_lower)}', 0.9, 1),
-            ]
+            # Slice the already-lowercased text instead of lowercasing again
+            context_lower = text_lower[start:end]
+
+            # Position of pattern in context follows from the slice start
+            pattern_pos_in_context = pos - start
+
+            # Every attribution pattern needs quote marks, so skip them all
+            # when the context has none
+            attribution_loop = compiled_attrib
+            if QUOTE_SET.isdisjoint(context_text):
+                attribution_loop = []
 
             # Try each attribution pattern
-            for regex, score, quote_group in attribution_patterns:
-                match = re.search(regex, context_lower, re.IGNORECASE)
+            for rx, score, quote_group in attribution_loop:
+                match = rx.search(context_lower)
                 if match:
                     try:
                         extracted_quote = match.group(quote_group)
@@ -122,21 +242,8 @@ def extract_quotations_for_figure(conn, figure_id, name, search_patterns):
 
             # If no attributed quote found, check for weaker indicators
             if not is_direct_quote:
-                # Check if the name is mentioned with verbs suggesting teaching/belief
-                weak_indicators = [
-                    (rf'{re.escape(pattern_lower)}\s+believed', 0.5),
-                    (rf'{re.escape(pattern_lower)}\s+argued', 0.5),
-                    (rf'{re.escape(pattern_lower)}\s+stated', 0.5),
-                    (rf'according to\s+{re.escape(pattern_lower)}', 0.4),
-                    (rf'philosophy of\s+{re.escape(pattern_lower)}', 0.4),
-                    (rf'teachings of\s+{re.escape(pattern_lower)}', 0.5),
-                    (rf'ideas of\s+{re.escape(pattern_lower)}', 0.4),
-                    (rf'legacy of\s+{re.escape(pattern_lower)}', 0.4),
-                    (rf"{re.escape(pattern_lower)}['']s\s+(words|teachings|philosophy|ideas)", 0.5),
-                ]
-
-                for regex, score in weak_indicators:
-                    if re.search(regex, context_lower, re.IGNORECASE):
+                for rx, score in compiled_weak:
+                    if rx.search(context_lower):
                         confidence = max(confidence, score)
 
             # Use extracted quote if found, otherwise use the context around the name
@@ -148,7 +255,7 @@ def extract_quotations_for_figure(conn, figure_id, name, search_patterns):
                 name_end = min(len(context_text), pattern_pos_in_context + len(pattern) + 150)
                 quote_text = context_text[name_start:name_end]
 
-            quotations.append({
+            yield {
                 'figure_id': figure_id,
                 'speech_id': speech_id,
                 'chunk_id': chunk_id,
@@ -158,30 +265,56 @@ def extract_quotations_for_figure(conn, figure_id, name, search_patterns):
                 'country_name': country,
                 'is_direct_quote': is_direct_quote,
                 'confidence_score': confidence
-            })
-
-    return quotations
+            }
 
 def deduplicate_quotations(quotations):
-    """Remove duplicate quotations (same speech_id and similar text)."""
+    """Filter out duplicate quotations (same speech_id and similar text) as they stream by."""
     seen = set()
-    unique = []
 
     for q in quotations:
-        key = (q['speech_id'], q['quote_text'][:100])
-        if key not in seen:
-            seen.add(key)
-            unique.append(q)
-
-    return unique
+        # Store the hash of the text prefix rather than the 100-char substring
+        key = (q['speech_id'], hash(q['quote_text'][:100]))
+        if key in seen:
+            continue
+        seen.add(key)
+        yield q
+
+def quotation_row(q):
+    """Convert a quotation dict to INSERT_QUOTATION_SQL parameters."""
+    return (
+        q['figure_id'], q['speech_id'], q['chunk_id'],
+        q['quote_text'], q['context_text'],
+        q['year'], q['country_name'],
+        q['is_direct_quote'], q['confidence_score']
+    )
+
+def process_figure(figure_id, name, search_patterns):
+    """Extract and deduplicate quotations for one figure in a worker process."""
+    conn = sqlite3.connect(f"{DB_PATH.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        # Results cross the process boundary as a list, but only unique
+        # quotations are ever collected. Chunks are fetched unordered, so sort
+        # once here to keep the insert order newest-first.
+        quotations = extract_quotations_for_figure(conn, figure_id, name, search_patterns)
+        return sorted(deduplicate_quotations(quotations), key=itemgetter('year'), reverse=True)
+    finally:
+        conn.close()
 
 def main():
     conn = get_connection()
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
     cursor = conn.cursor()
 
+    # Workers open the database read-only, so build the index up front
+    ensure_chunks_fts(conn)
+
     # Clear existing quotations
     print("Clearing existing quotations...")
     cursor.execute("DELETE FROM quotations")
+    # Drop the lookup index during the bulk insert; it's rebuilt afterwards
+    cursor.execute("DROP INDEX IF EXISTS idx_quotations_figure_speech")
     conn.commit()
 
     # Get all notable figures
@@ -193,32 +326,37 @@ def main():
     total_quotations = 0
     total_direct_quotes = 0
 
-    for figure_id, name, search_patterns in figures:
-        print(f"  Processing: {name}...", end=" ")
+    # Insert all figures in a single transaction
+    conn.execute("BEGIN")
 
-        quotations = extract_quotations_for_figure(conn, figure_id, name, search_patterns)
-        quotations = deduplicate_quotations(quotations)
+    # Figures are independent, so extract them in parallel. Results are
+    # inserted in submission order so quotation ids are the same every run.
+    with ProcessPoolExecutor() as executor:
+        futures = [
+            (name, executor.submit(process_figure, figure_id, name, search_patterns))
+            for figure_id, name, search_patterns in figures
+        ]
 
-        direct_count = sum(1 for q in quotations if q['is_direct_quote'])
+        for name, future in futures:
+            quotations = future.result()
 
-        # Insert into database
-        for q in quotations:
-            cursor.execute("""
-                INSERT INTO quotations
-                (figure_id, speech_id, chunk_id, quote_text, context_text,
-                 year, country_name, is_direct_quote, confidence_score)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                q['figure_id'], q['speech_id'], q['chunk_id'],
-                q['quote_text'], q['context_text'],
-                q['year'], q['country_name'],
-                q['is_direct_quote'], q['confidence_score']
-            ))
-
-        total_quotations += len(quotations)
-        total_direct_quotes += direct_count
-        print(f"found {len(quotations)} mentions ({direct_count} direct quotes)")
+            direct_count = sum(1 for q in quotations if q['is_direct_quote'])
+
+            # Insert into database
+            cursor.executemany(INSERT_QUOTATION_SQL, map(quotation_row, quotations))
+
+            total_quotations += len(quotations)
+            total_direct_quotes += direct_count
+            print(f"  {name}: found {len(quotations)} mentions ({direct_count} direct quotes)")
+
+    conn.commit()
 
+    # Indexes for the summary queries below, created after the bulk insert
+    print("Creating indexes...")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_quotations_figure_speech ON quotations(figure_id, speech_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notable_figures_category ON notable_figures(category)")
+    cursor.execute("ANALYZE quotations")
+    cursor.execute("ANALYZE notable_figures")
     conn.commit()
 
     # Print summary
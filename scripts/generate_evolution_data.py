@@ -2,80 +2,102 @@ import json
 import os
 import re
 import sqlite3
-from collections import defaultdict
+from collections import Counter
+
+try:
+    # Optional: orjson serializes the output several times faster than json
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Optional: google-re2 scans in linear time, much faster for plain alternations
+    import re2
+except ImportError:
+    re2 = None
 
 DB_PATH = os.path.join(os.getcwd(), "data", "un_speeches.db")
 OUTPUT_PATH = os.path.join(os.getcwd(), "app", "lib", "evolution-data.json")
 
 
+def compile_case_insensitive(pattern):
+    """Compile with re2 when installed, falling back to the stdlib re engine."""
+    if re2 is not None:
+        options = re2.Options()
+        options.case_sensitive = False
+        return re2.compile(pattern, options)
+    return re.compile(pattern, re.IGNORECASE)
+
+
 def generate_data():
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
+    # Raw patterns; only the combined alternation below is compiled
     concepts = {
-        "sc_reform": re.compile(
-            r"\b(security council reform|structural reform|enlarge the council|permanent seat|veto power)\b",
-            re.IGNORECASE,
-        ),
-        "human_rights": re.compile(
-            r"\b(human rights|fundamental freedoms|universal declaration)\b",
-            re.IGNORECASE,
-        ),
-        "sovereignty": re.compile(
-            r"\b(sovereignty|non-interference|domestic affairs|territorial integrity)\b",
-            re.IGNORECASE,
-        ),
-        "multilateralism": re.compile(
-            r"\b(multilateralism|rules-based|international order)\b", re.IGNORECASE
-        ),
+        "sc_reform": r"\b(security council reform|structural reform|enlarge the council|permanent seat|veto power)\b",
+        "human_rights": r"\b(human rights|fundamental freedoms|universal declaration)\b",
+        "sovereignty": r"\b(sovereignty|non-interference|domestic affairs|territorial integrity)\b",
+        "multilateralism": r"\b(multilateralism|rules-based|international order)\b",
     }
 
+    # One alternation with a named group per concept, so each speech is
+    # scanned once instead of once per concept
+    combined = compile_case_insensitive(
+        "|".join(f"(?P<{k}>{p})" for k, p in concepts.items())
+    )
+
+    # Per-country mention counts start from a copy of this
+    mentions_template = {k: 0 for k in concepts}
+
     print("Generating evolution data...")
 
     # Data structure for Recharts: Array of { year, region_concept: val, ... }
     # But filtering by region for separate lines is better.
     # Let's do: Array of { year, Africa_sc_reform: 10.5, WEOG_sc_reform: 5.2, ... }
 
-    # Aggregators
-    regional_counts = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    # Aggregators: flat counts keyed by (year, region, concept or "total")
+    regional_counts = Counter()
     country_stats_2024 = {}
 
+    # Normalize region names to timeline keys in SQL, so the raw region
+    # string never has to cross into Python. Rows stay in year order: map_data
+    # order and each country's region follow the first row seen.
     cursor.execute("""
-        SELECT year, region, country_code, text 
-        FROM speeches 
-        WHERE region IS NOT NULL AND region != '' 
+        SELECT
+            year,
+            CASE
+                WHEN instr(region, 'Africa') > 0 THEN 'Africa'
+                WHEN instr(region, 'Asia') > 0 THEN 'Asia'
+                WHEN instr(region, 'Eastern') > 0 THEN 'EasternEu'
+                WHEN instr(region, 'Latin') > 0 OR instr(region, 'GRULAC') > 0 THEN 'LatAm'
+                WHEN instr(region, 'Western') > 0 OR instr(region, 'WEOG') > 0 THEN 'West'
+                ELSE 'Other'
+            END AS reg_key,
+            country_code,
+            text
+        FROM speeches
+        WHERE region IS NOT NULL AND region != ''
         ORDER BY year ASC
     """)
 
-    rows = cursor.fetchall()
-
-    for row in rows:
+    # Stream rows instead of fetchall() so only one speech text is held at a time
+    for row in cursor:
         year = row["year"]
-        region = row["region"]
+        reg_key = row["reg_key"]
         code = row["country_code"]
         text = row["text"]
 
-        # Normalize Region names for keys
-        reg_key = "Other"
-        if "Africa" in region:
-            reg_key = "Africa"
-        elif "Asia" in region:
-            reg_key = "Asia"
-        elif "Eastern" in region:
-            reg_key = "EasternEu"
-        elif "Latin" in region or "GRULAC" in region:
-            reg_key = "LatAm"
-        elif "Western" in region or "WEOG" in region:
-            reg_key = "West"
-
-        regional_counts[year][reg_key]["total"] += 1
-
-        matches = {}
-        for concept, pattern in concepts.items():
-            if pattern.search(text):
-                regional_counts[year][reg_key][concept] += 1
-                matches[concept] = True
+        regional_counts[(year, reg_key, "total")] += 1
+
+        matches = set()
+        for m in combined.finditer(text):
+            matches.add(m.lastgroup)
+            if len(matches) == len(concepts):
+                break
+        for concept in matches:
+            regional_counts[(year, reg_key, concept)] += 1
 
         # Save 2024 data for the globe
         if year >= 2023:  # Use 2023-2024 for better coverage
@@ -83,7 +105,7 @@ def generate_data():
                 country_stats_2024[code] = {
                     "region": reg_key,
                     "name": code,
-                    "mentions": {k: 0 for k in concepts},
+                    "mentions": mentions_template.copy(),
                     "total_speeches": 0,
                 }
             country_stats_2024[code]["total_speeches"] += 1
@@ -94,16 +116,15 @@ def generate_data():
 
     # Format timeline
     timeline = []
-    years = sorted(regional_counts.keys())
+    years = sorted({key[0] for key in regional_counts})
     for y in years:
         entry = {"year": y}
         for reg in ["Africa", "Asia", "EasternEu", "LatAm", "West"]:
-            data = regional_counts[y][reg]
-            total = data["total"]
+            total = regional_counts.get((y, reg, "total"), 0)
             for concept in concepts:
                 # Calculate percentage
                 val = 0
-                count = data[concept]
+                count = regional_counts.get((y, reg, concept), 0)
                 if total > 0:
                     val = round((count / total) * 100, 2)
                 entry[f"{reg}_{concept}"] = val  # Percentage
@@ -130,8 +151,12 @@ def generate_data():
         "meta": {"min_year": years[0], "max_year": years[-1]},
     }
 
-    with open(OUTPUT_PATH, "w") as f:
-        json.dump(final_output, f)
+    if orjson is not None:
+        with open(OUTPUT_PATH, "wb") as f:
+            f.write(orjson.dumps(final_output))
+    else:
+        with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+            json.dump(final_output, f, separators=(",", ":"), ensure_ascii=False)
 
     print(f"Saved JSON to {OUTPUT_PATH}")
 